@@ -0,0 +1,316 @@
+"""
+Agrupamento de municípios e segmentos de rodovia por perfil de acidentes.
+
+O perfil de cada unidade (município ou segmento de 1 km de BR) é o vetor com a
+composição dos seus acidentes: tipos, causas, condição meteorológica, período
+do dia e taxas de severidade. Os perfis são padronizados e agrupados com
+k-means em mini-lotes (Sculley, 2010), implementado em NumPy vetorizado, e o
+número de grupos é escolhido pela silhueta média calculada sobre uma amostra.
+"""
+
+import numpy as np
+import pandas as pd
+
+UNIDADES = {
+    "municipio": "Município",
+    "segmento": "Segmento de 1 km (BR)",
+}
+
+# (coluna, quantas categorias mais frequentes entram no perfil; o resto vira "Outros")
+BLOCOS_CATEGORICOS = [
+    ("tipo_acidente", 10),
+    ("causa_acidente", 10),
+    ("condicao_metereologica", 6),
+]
+PERIODOS = ["Madrugada (0-5h)", "Manhã (6-11h)", "Tarde (12-17h)", "Noite (18-23h)"]
+
+
+# ==============================================
+# Perfis
+# ==============================================
+def _acidentes(df):
+    """Uma linha por acidente (a base vem com uma linha por envolvido/causa)."""
+    colunas = ["id", "uf", "municipio", "br", "km", "latitude", "longitude", "hora"]
+    colunas += [col for col, _ in BLOCOS_CATEGORICOS]
+    base = df[[c for c in colunas if c in df.columns]]
+
+    # A linha com a causa principal representa o acidente; sem ela, a primeira linha
+    ordem = np.arange(len(df))
+    if "causa_principal" in df.columns:
+        ordem = ordem + len(df) * df["causa_principal"].ne("Sim").fillna(True).to_numpy(dtype=bool)
+    escolhida = pd.Series(ordem, index=df.index).groupby(df["id"].to_numpy()).min().to_numpy() % len(df)
+    acid = base.iloc[escolhida].reset_index(drop=True)
+
+    sev = df.groupby("id")[["feridos_graves", "mortos", "total_vitimas"]].sum()
+    acid[sev.columns] = sev.reindex(acid["id"]).to_numpy()
+    return acid
+
+
+def _chaves_unidade(acid, unidade):
+    """Colunas que identificam a unidade; segmentos são (UF, BR, km inteiro)."""
+    if unidade == "municipio":
+        return pd.DataFrame({"uf": acid["uf"], "municipio": acid["municipio"]})
+
+    km = acid["km"]
+    if not pd.api.types.is_numeric_dtype(km):
+        km = km.astype("string").str.replace(",", ".")
+    return pd.DataFrame({
+        "uf": acid["uf"],
+        "br": pd.to_numeric(acid["br"], errors="coerce"),
+        "km": np.floor(pd.to_numeric(km, errors="coerce")),
+    })
+
+
+def _rotulos(chaves, unidade):
+    if unidade == "municipio":
+        return (chaves["uf"].astype("string") + " - " + chaves["municipio"].astype("string")).to_numpy()
+    return (
+        chaves["uf"].astype("string") + " BR-" + chaves["br"].astype(int).astype("string").str.zfill(3)
+        + " km " + chaves["km"].astype(int).astype("string")
+    ).to_numpy()
+
+
+def _proporcoes(codigos, n_unidades, valores, categorias, prefixo):
+    """Proporção de cada categoria por unidade, via np.bincount (sem groupby em Python)."""
+    cat = pd.Categorical(valores, categories=categorias)
+    cod_cat = cat.codes.astype(np.int64)
+    validos = cod_cat >= 0
+    contagem = np.bincount(
+        codigos[validos] * len(categorias) + cod_cat[validos],
+        minlength=n_unidades * len(categorias),
+    ).reshape(n_unidades, len(categorias))
+    total = contagem.sum(axis=1, keepdims=True)
+    prop = contagem / np.where(total > 0, total, 1)
+    return pd.DataFrame(prop, columns=[f"{prefixo}: {c}" for c in categorias])
+
+
+def construir_perfis(df, unidade="municipio", min_acidentes=5):
+    """
+    Monta os perfis por unidade. Retorna (perfis, blocos): `perfis` tem as
+    proporções/taxas por unidade mais `acidentes`, `latitude` e `longitude`;
+    `blocos` mapeia cada bloco de variáveis às suas colunas.
+    """
+    acid = _acidentes(df)
+    chaves = _chaves_unidade(acid, unidade)
+    # Acidentes sem BR/km (ou sem município) ficam de fora
+    codigos = (
+        chaves.groupby(list(chaves.columns), sort=False, dropna=True).ngroup()
+        .fillna(-1).to_numpy(dtype=np.int64)
+    )
+    validos = codigos >= 0
+    n_acid = np.bincount(codigos[validos])
+    manter = validos & (n_acid[np.where(validos, codigos, 0)] >= min_acidentes)
+    if not manter.any():
+        return pd.DataFrame(), {}
+
+    acid, chaves = acid[manter], chaves[manter]
+    codigos = np.unique(codigos[manter], return_inverse=True)[1]  # renumera 0..n-1
+    n = codigos.max() + 1
+    _, primeiros = np.unique(codigos, return_index=True)
+    unidades = _rotulos(chaves.iloc[primeiros], unidade)
+    n_acid = np.bincount(codigos, minlength=n)
+
+    def media(valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        ok = ~np.isnan(valores)
+        soma = np.bincount(codigos[ok], weights=valores[ok], minlength=n)
+        cont = np.bincount(codigos[ok], minlength=n)
+        return np.divide(soma, cont, out=np.full(n, np.nan), where=cont > 0)
+
+    partes, blocos = [], {}
+
+    for col, top in BLOCOS_CATEGORICOS:
+        if col in acid.columns:
+            valores = acid[col].astype("string").fillna("NA")
+            principais = list(valores.value_counts().index[:top])
+            valores = valores.where(valores.isin(principais), "Outros")
+            categorias = principais + (["Outros"] if (valores == "Outros").any() else [])
+            tab = _proporcoes(codigos, n, valores, categorias, col)
+            partes.append(tab)
+            blocos[col] = list(tab.columns)
+
+    if "hora" in acid.columns and acid["hora"].notna().any():
+        periodo = pd.cut(acid["hora"], bins=[-1, 5, 11, 17, 23], labels=PERIODOS)
+        tab = _proporcoes(codigos, n, periodo, PERIODOS, "periodo")
+        partes.append(tab)
+        blocos["periodo"] = list(tab.columns)
+
+    sev = pd.DataFrame({
+        "% com vítimas": media(acid["total_vitimas"] > 0),
+        "% com mortos": media(acid["mortos"] > 0),
+        "feridos graves / acidente": media(acid["feridos_graves"]),
+        "mortos / acidente": media(acid["mortos"]),
+    })
+    partes.append(sev)
+    blocos["severidade"] = list(sev.columns)
+
+    perfis = pd.concat(partes, axis=1).fillna(0)
+    perfis.insert(0, "unidade", unidades)
+    perfis["acidentes"] = n_acid
+    perfis["latitude"] = media(acid["latitude"])
+    perfis["longitude"] = media(acid["longitude"])
+    return perfis, blocos
+
+
+def matriz_padronizada(perfis, blocos):
+    """Padroniza (z-score) e pondera cada bloco por 1/sqrt(colunas), para que blocos grandes não dominem."""
+    colunas = [c for cols in blocos.values() for c in cols]
+    X = perfis[colunas].to_numpy(dtype=np.float64)
+    desvio = X.std(axis=0)
+    X = (X - X.mean(axis=0)) / np.where(desvio > 0, desvio, 1.0)
+
+    pesos = np.concatenate([np.full(len(cols), 1 / np.sqrt(len(cols))) for cols in blocos.values()])
+    return X * pesos
+
+
+# ==============================================
+# K-means em mini-lotes
+# ==============================================
+def _distancias2(X, centros):
+    """Distâncias euclidianas ao quadrado (n x k), via ||x||² - 2x·c + ||c||²."""
+    d2 = (X ** 2).sum(axis=1)[:, None] - 2 * X @ centros.T + (centros ** 2).sum(axis=1)[None, :]
+    return np.maximum(d2, 0)
+
+
+def _atribuir(X, centros, lote=65536):
+    rotulos = np.empty(X.shape[0], dtype=np.int64)
+    d2min = np.empty(X.shape[0])
+    for i in range(0, X.shape[0], lote):
+        d2 = _distancias2(X[i:i + lote], centros)
+        rotulos[i:i + lote] = d2.argmin(axis=1)
+        d2min[i:i + lote] = d2[np.arange(d2.shape[0]), rotulos[i:i + lote]]
+    return rotulos, d2min
+
+
+def _kmeans_pp(X, k, rng):
+    """Inicialização k-means++."""
+    centros = [X[rng.integers(X.shape[0])]]
+    d2 = _distancias2(X, np.asarray(centros))[:, 0]
+    for _ in range(1, k):
+        total = d2.sum()
+        idx = rng.choice(X.shape[0], p=d2 / total) if total > 0 else rng.integers(X.shape[0])
+        centros.append(X[idx])
+        d2 = np.minimum(d2, _distancias2(X, X[idx][None, :])[:, 0])
+    return np.asarray(centros)
+
+
+def minibatch_kmeans(X, k, tam_lote=1024, max_iter=100, n_init=3, tol=1e-4, seed=0):
+    """
+    K-means em mini-lotes. Retorna (centros, rotulos, inercia) da melhor de
+    `n_init` inicializações (menor inércia).
+    """
+    rng = np.random.default_rng(seed)
+    n = X.shape[0]
+    k = min(k, n)
+    tam_lote = min(tam_lote, n)
+    melhor = None
+
+    for _ in range(n_init):
+        # k-means++ sobre uma amostra, para não custar O(n·k) com n grande
+        amostra = X[rng.choice(n, size=min(n, 20 * tam_lote), replace=False)]
+        centros = _kmeans_pp(amostra, k, rng)
+        contagens = np.zeros(k)
+
+        for _ in range(max_iter):
+            lote = X[rng.integers(0, n, tam_lote)]
+            rotulos, _ = _atribuir(lote, centros)
+
+            # Soma e contagem por centro num só produto matricial (one-hot^T · lote)
+            one_hot = np.zeros((tam_lote, k))
+            one_hot[np.arange(tam_lote), rotulos] = 1
+            cont = one_hot.sum(axis=0)
+            somas = one_hot.T @ lote
+
+            contagens += cont
+            ativos = cont > 0
+            taxa = np.zeros(k)
+            taxa[ativos] = cont[ativos] / contagens[ativos]
+            medias = np.divide(somas, cont[:, None], out=centros.copy(), where=ativos[:, None])
+            novos = centros + taxa[:, None] * (medias - centros)
+
+            deslocamento = np.sqrt(((novos - centros) ** 2).sum(axis=1)).max()
+            centros = novos
+            if deslocamento < tol:
+                break
+
+        rotulos, d2 = _atribuir(X, centros)
+        inercia = float(d2.sum())
+        if melhor is None or inercia < melhor[2]:
+            melhor = (centros, rotulos, inercia)
+
+    return melhor
+
+
+def silhueta(X, rotulos, amostra=2000, seed=0):
+    """Silhueta média sobre uma amostra de até `amostra` pontos (O(amostra²) em memória)."""
+    rng = np.random.default_rng(seed)
+    if X.shape[0] > amostra:
+        idx = rng.choice(X.shape[0], size=amostra, replace=False)
+        X, rotulos = X[idx], rotulos[idx]
+
+    grupos, rotulos = np.unique(rotulos, return_inverse=True)
+    if len(grupos) < 2:
+        return 0.0
+
+    D = np.sqrt(_distancias2(X, X))
+    one_hot = np.zeros((X.shape[0], len(grupos)))
+    one_hot[np.arange(X.shape[0]), rotulos] = 1
+    tamanhos = one_hot.sum(axis=0)
+    somas = D @ one_hot
+
+    proprio = tamanhos[rotulos]
+    a = somas[np.arange(X.shape[0]), rotulos] / np.maximum(proprio - 1, 1)
+    medias = somas / tamanhos
+    medias[np.arange(X.shape[0]), rotulos] = np.inf
+    b = medias.min(axis=1)
+
+    s = (b - a) / np.maximum(np.maximum(a, b), 1e-12)
+    s[proprio == 1] = 0
+    return float(s.mean())
+
+
+def ks_validos(ks, n_unidades):
+    """Valores de k utilizáveis com `n_unidades` (a silhueta exige 2 <= k < n)."""
+    return [k for k in ks if 2 <= k < n_unidades]
+
+
+def escolher_k(X, ks=range(2, 9), seed=0, **kwargs):
+    """
+    Roda o k-means para cada k e escolhe o de maior silhueta. Retorna
+    (k, rotulos, centros, silhuetas). Só valem 2 <= k < número de pontos.
+    """
+    ks = ks_validos(ks, X.shape[0])
+    if not ks:
+        raise ValueError(f"Nenhum k válido para {X.shape[0]} pontos (use 2 <= k < {X.shape[0]}).")
+    resultados, silhuetas = {}, {}
+    for k in ks:
+        centros, rotulos, _ = minibatch_kmeans(X, k, seed=seed, **kwargs)
+        resultados[k] = (rotulos, centros)
+        silhuetas[k] = silhueta(X, rotulos, seed=seed)
+
+    k = max(silhuetas, key=silhuetas.get)
+    rotulos, centros = resultados[k]
+    return k, rotulos, centros, silhuetas
+
+
+def agrupar_perfis(df, unidade="municipio", ks=range(2, 9), min_acidentes=5, seed=0):
+    """
+    Pipeline completo. Retorna dict com `perfis` (com a coluna `grupo`),
+    `medias` (perfil médio de cada grupo, nas escalas originais), `k` e
+    `silhuetas` ({k: silhueta}); ou None se nenhum k de `ks` for menor que o
+    número de unidades (inclusive com menos de 3 unidades).
+    """
+    perfis, blocos = construir_perfis(df, unidade, min_acidentes)
+    if not ks_validos(ks, len(perfis)):
+        return None
+
+    X = matriz_padronizada(perfis, blocos)
+    k, rotulos, _, silhuetas = escolher_k(X, ks, seed=seed)
+
+    perfis["grupo"] = rotulos + 1
+    colunas = [c for cols in blocos.values() for c in cols]
+    medias = perfis.groupby("grupo")[colunas].mean()
+    medias.insert(0, "unidades", perfis.groupby("grupo").size())
+    medias.insert(1, "acidentes", perfis.groupby("grupo")["acidentes"].sum())
+
+    return {"perfis": perfis, "medias": medias.reset_index(), "k": k, "silhuetas": silhuetas}
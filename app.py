@@ -1,13 +1,21 @@
+import os
+
 import pandas as pd
 import numpy as np
 import streamlit as st
 import plotly.express as px
 
+from agrupamento import UNIDADES, agrupar_perfis
+from particoes import (
+    ARQUIVO_REGIOES, DIR_PARTICOES,
+    anos_disponiveis, carregar_regioes, ler_regiao, listar_particoes,
+)
+
 # ==============================================
 # Configuração inicial
 # ==============================================
 st.set_page_config(
-    page_title="EDA Acidentes RIDE-DF 2024",
+    page_title="EDA Acidentes PRF",
     layout="wide",
     initial_sidebar_state="expanded"
 )
@@ -15,10 +23,7 @@ st.set_page_config(
 # ==============================================
 # Carregar dados
 # ==============================================
-@st.cache_data
-def load_data(path):
-    df = pd.read_csv(path)
-
+def preparar(df):
     # Conversões
     if "data_inversa" in df.columns:
         df["data_inversa"] = pd.to_datetime(df["data_inversa"], errors="coerce")
@@ -46,13 +51,69 @@ def load_data(path):
 
     return df
 
-df = load_data("data/acidentes_ride.csv")
+@st.cache_data
+def load_data(path):
+    return preparar(pd.read_csv(path))
+
+@st.cache_data(ttl=600)
+def load_partitions(base):
+    return listar_particoes(base)
+
+# Poucas entradas: cada região carregada fica em memória, compartilhada entre as sessões
+@st.cache_data(ttl=600, max_entries=8)
+def load_region(base, regiao, anos):
+    return preparar(ler_regiao(load_partitions(base), regiao, anos))
+
+# `filtro` identifica o recorte carregado (chave de cache; o DataFrame em si não é hasheado)
+@st.cache_data(ttl=600, max_entries=16)
+def load_clusters(_df, filtro, unidade, k_min, k_max, min_acidentes):
+    return agrupar_perfis(_df, unidade, range(k_min, k_max + 1), min_acidentes)
+
+# ACIDENTES_DIR aponta para a base particionada por UF/ano (ver etl.py);
+# sem partições, o app usa o arquivo único de ACIDENTES_PATH (padrão: data/acidentes_ride.csv)
+base_particoes = os.environ.get("ACIDENTES_DIR", DIR_PARTICOES)
+particoes = load_partitions(base_particoes)
 
 
 # ==============================================
 # Barra lateral
 # ==============================================
-st.sidebar.header("Análise Exploratória de Acidentes de Trânsito na RIDE-DF (2024)")
+if particoes:
+    regioes = carregar_regioes(os.environ.get("ACIDENTES_REGIOES", ARQUIVO_REGIOES))
+    ufs_disponiveis = {uf for uf, _ in particoes}
+    opcoes_regiao = [nome for nome, cfg in regioes.items() if ufs_disponiveis & set(cfg["ufs"])]
+    if not opcoes_regiao:
+        st.warning(
+            f"Nenhuma região configurada cobre as UFs com dados ({', '.join(sorted(ufs_disponiveis))}). "
+            "Revise o arquivo de regiões."
+        )
+        st.stop()
+
+    def rotulo_regiao(nome):
+        # UFs inteiras aparecem pelo nome do estado: "Goiás (GO)"
+        if regioes[nome]["ufs"] == {nome: "*"}:
+            return f"{regioes[nome].get('descricao', nome)} ({nome})"
+        return nome
+
+    regiao_nome = st.sidebar.selectbox("Região:", opcoes_regiao, format_func=rotulo_regiao)
+    regiao_rotulo = rotulo_regiao(regiao_nome)
+    anos_regiao = anos_disponiveis(particoes, regioes[regiao_nome])
+    anos = sorted(st.sidebar.multiselect("Ano(s):", anos_regiao, default=anos_regiao[-1:]))
+
+    df = load_region(base_particoes, regioes[regiao_nome], tuple(anos))
+    filtro = (base_particoes, regiao_nome, regioes[regiao_nome], tuple(anos))
+else:
+    regiao_rotulo = "RIDE-DF"
+    caminho = os.environ.get("ACIDENTES_PATH", "data/acidentes_ride.csv")
+    df = load_data(caminho)
+    filtro = (caminho,)
+    anos = []
+    if "data_inversa" in df.columns:
+        anos = sorted(df["data_inversa"].dt.year.dropna().astype(int).unique())
+
+periodo = f"{anos[0]}" if len(anos) == 1 else f"{anos[0]}–{anos[-1]}" if anos else "sem ano"
+
+st.sidebar.header(f"Análise Exploratória de Acidentes de Trânsito — {regiao_rotulo} ({periodo})")
 st.sidebar.markdown("Fonte dos Dados: PRF")
 section = st.sidebar.radio(
     "Escolha a seção:",
@@ -66,6 +127,10 @@ section = st.sidebar.radio(
     ]
 )
 
+if df.empty:
+    st.warning("Nenhum acidente encontrado para a região e o(s) ano(s) selecionados.")
+    st.stop()
+
 # ==============================================
 # 1) Visão Geral
 # ==============================================
@@ -77,7 +142,7 @@ if section == "Visão Geral":
     # KPIs
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("💥 Total de registros", f"{df.shape[0]:,}".replace(",", "."))
-    col2.metric("🗺️ Municípios da RIDE", df["municipio"].nunique())
+    col2.metric("🗺️ Municípios da região", df["municipio"].nunique())
     col3.metric("🚑 Total de vítimas", int(df["total_vitimas"].sum()))
     col4.metric("📉 Vítimas por acidente", round(df["total_vitimas"].sum() / df["id"].nunique(), 2))
 
@@ -424,7 +489,7 @@ elif section == "Severidade":
         resumo = df_agregado[["ilesos","feridos_leves","feridos_graves","mortos","total_vitimas"]].sum().reset_index()
         resumo.columns = ["Categoria", "Total"]
 
-        st.write("###### 🚨 Totais de vítimas na base (2024)")
+        st.write(f"###### 🚨 Totais de vítimas na base ({periodo})")
         fig = px.bar(resumo, x="Categoria", y="Total", text="Total")
         fig.update_traces(textposition="outside")
     
@@ -621,7 +686,7 @@ elif section == "Geografia":
                 "Com mortos": "red"
             }
         )
-        fig.update_layout(mapbox_style="open-street-map")
+        fig.update_layout(map_style="open-street-map")
         fig.update_layout(title=None, margin={"r":0,"t":0,"l":0,"b":0})
         st.plotly_chart(fig, use_container_width=True, config={"scrollZoom": True})
 
@@ -649,10 +714,72 @@ elif section == "Geografia":
                 height=600,
                 color_continuous_scale="Reds"
             )
-            fig.update_layout(mapbox_style="open-street-map")
+            fig.update_layout(map_style="open-street-map")
             fig.update_layout(title=None, margin={"r":0,"t":0,"l":0,"b":0})
             st.plotly_chart(fig, use_container_width=True, config={"scrollZoom": True})
 
+        st.divider()
+
+        # Agrupamento por perfil de acidentes (ver agrupamento.py)
+        st.write("###### 🧩 Agrupamentos por perfil de acidentes")
+        col1, col2, col3 = st.columns(3)
+        unidade = col1.radio("Agrupar:", list(UNIDADES), format_func=UNIDADES.get, horizontal=True)
+        k_min, k_max = col2.slider("Número de grupos (k) testados:", 2, 12, (2, 8))
+        min_acidentes = col3.number_input("Mínimo de acidentes por unidade:", 1, 100, 5)
+
+        grupos = load_clusters(df, filtro, unidade, k_min, k_max, int(min_acidentes))
+        if grupos is None:
+            st.info(
+                "Poucas unidades com acidentes suficientes para a faixa de k escolhida "
+                "(k precisa ser menor que o número de unidades). "
+                "Reduza o k ou o mínimo de acidentes por unidade."
+            )
+        else:
+            perfis = grupos["perfis"].dropna(subset=["latitude","longitude"])
+            perfis["grupo"] = perfis["grupo"].astype(str)
+            k = grupos["k"]
+            st.caption(
+                f"{len(grupos['perfis'])} unidades em k = {k} grupos, "
+                f"escolhido pela maior silhueta média ({grupos['silhuetas'][k]:.3f})."
+            )
+
+            fig = px.scatter_map(
+                perfis,
+                lat="latitude", lon="longitude",
+                size="acidentes",
+                color="grupo",
+                hover_name="unidade",
+                hover_data={"acidentes":True,"% com vítimas":":.1%","mortos / acidente":":.3f",
+                            "latitude":False,"longitude":False},
+                category_orders={"grupo": [str(g) for g in range(1, k + 1)]},
+                zoom=7,
+                height=600
+            )
+            fig.update_layout(map_style="open-street-map")
+            fig.update_layout(title=None, margin={"r":0,"t":0,"l":0,"b":0})
+            st.plotly_chart(fig, use_container_width=True, config={"scrollZoom": True})
+
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                sil = pd.DataFrame(list(grupos["silhuetas"].items()), columns=["k","silhueta"])
+                st.write("###### 📐 Silhueta média por k")
+                fig = px.line(sil, x="k", y="silhueta", markers=True)
+                fig.add_vline(x=k, line_dash="dash", line_color="red")
+                st.plotly_chart(fig, use_container_width=True)
+
+            with col2:
+                # Perfil médio de cada grupo, em desvios-padrão em relação ao conjunto das unidades
+                medias = grupos["medias"].set_index("grupo")
+                colunas = medias.columns.drop(["unidades","acidentes"])
+                z = (medias[colunas] - grupos["perfis"][colunas].mean()) / grupos["perfis"][colunas].std().replace(0, 1)
+                st.write("###### 🧬 Perfil dos grupos (desvio em relação à média, em DP)")
+                fig = px.imshow(z.T, aspect="auto", color_continuous_scale="RdBu_r", zmin=-2, zmax=2,
+                                labels={"x":"grupo","y":"variável","color":"z"})
+                st.plotly_chart(fig, use_container_width=True)
+
+            st.write("###### 📋 Perfil médio por grupo")
+            st.dataframe(medias.reset_index(), use_container_width=True, hide_index=True)
+
 
 # ==============================================
 # 6) Tabelas
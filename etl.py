@@ -0,0 +1,43 @@
+"""
+ETL da base de acidentes da PRF para o armazenamento particionado por UF e ano.
+
+Recebe os CSVs anuais da PRF (ex.: acidentes2024_todas_causas_tipos.csv,
+separador ";" e encoding latin-1) e grava a base nacional em
+data/particoes/uf=XX/ano=AAAA/acidentes.parquet. O recorte geográfico deixa de
+ser feito aqui: as regiões ficam em regioes.json e são aplicadas pelo app na
+leitura.
+
+Exemplo:
+    python etl.py dados_prf/acidentes2023_todas_causas_tipos.csv \
+        dados_prf/acidentes2024_todas_causas_tipos.csv
+"""
+
+import argparse
+
+import pandas as pd
+
+from particoes import DIR_PARTICOES, salvar_particoes
+
+
+def ler_csv_prf(path):
+    df = pd.read_csv(path, sep=";", encoding="latin-1", decimal=",", low_memory=False)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Particiona a base da PRF por UF e ano.")
+    parser.add_argument("arquivos", nargs="+", help="CSVs anuais da PRF.")
+    parser.add_argument("--destino", default=DIR_PARTICOES,
+                        help=f"Diretório das partições (padrão: {DIR_PARTICOES}).")
+    args = parser.parse_args(argv)
+
+    for path in args.arquivos:
+        df = ler_csv_prf(path)
+        gravadas, descartadas = salvar_particoes(df, args.destino)
+        print(f"{path}: {df.shape[0] - descartadas:,} registros em {len(gravadas)} partições; "
+              f"{descartadas:,} descartados sem UF ou data válida".replace(",", "."))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+"""
+Harness de carga para o dashboard Streamlit (app.py).
+
+Simula N sessões concorrentes com o AppTest do Streamlit, navegando por todas
+as seções da barra lateral, por todas as opções do selectbox de
+"Distribuições" e pelas regiões disponíveis, sobre bases sintéticas de tamanhos
+configuráveis (gravadas no formato particionado por UF/ano, ver particoes.py).
+
+Cada processo de trabalho executa várias sessões em threads, de modo que o
+cache (st.cache_data) é compartilhado entre as sessões do mesmo processo, como
+acontece em um servidor Streamlit real.
+
+O relatório JSON traz latência de rerun (p50/p95/p99, sem a carga inicial fria,
+que é reportada à parte), throughput e RSS por processo, e pode ser comparado
+com um relatório anterior via --baseline (só cenários com a mesma configuração).
+
+Exemplo:
+    python loadtest.py --linhas 5000 50000 --sessoes 8 --processos 2 \
+        --saida relatorio_carga.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from particoes import salvar_particoes
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+VERSAO_RELATORIO = 2
+
+
+# ==============================================
+# Base sintética
+# ==============================================
+MUNICIPIOS = [
+    ("BRASILIA", "DF", -15.79, -47.88),
+    ("VALPARAISO DE GOIAS", "GO", -16.07, -47.98),
+    ("LUZIANIA", "GO", -16.25, -47.95),
+    ("FORMOSA", "GO", -15.54, -47.33),
+    ("AGUAS LINDAS DE GOIAS", "GO", -15.76, -48.28),
+    ("CRISTALINA", "GO", -16.77, -47.61),
+    ("ABADIANIA", "GO", -16.20, -48.71),
+    ("ALEXANIA", "GO", -16.08, -48.51),
+    ("PADRE BERNARDO", "GO", -15.16, -48.28),
+    ("UNAI", "MG", -16.36, -46.90),
+    ("GOIANIA", "GO", -16.68, -49.25),
+    ("APARECIDA DE GOIANIA", "GO", -16.82, -49.24),
+]
+CATEGORIAS = {
+    "causa_principal": ["Sim", "Não"],
+    "causa_acidente": [
+        "Reação tardia ou ineficiente do condutor", "Ausência de reação do condutor",
+        "Velocidade Incompatível", "Ingestão de álcool pelo condutor",
+        "Acessar a via sem observar a presença dos outros veículos",
+    ],
+    "tipo_acidente": [
+        "Colisão traseira", "Saída de leito carroçável", "Colisão transversal",
+        "Tombamento", "Colisão frontal", "Atropelamento de Pedestre",
+    ],
+    "classificacao_acidente": ["Sem Vítimas", "Com Vítimas Feridas", "Com Vítimas Fatais"],
+    "fase_dia": ["Pleno dia", "Plena Noite", "Anoitecer", "Amanhecer"],
+    "condicao_metereologica": ["Céu Claro", "Nublado", "Chuva", "Sol", "Garoa/Chuvisco"],
+    "tipo_pista": ["Dupla", "Simples", "Múltipla"],
+    "tracado_via": ["Reta", "Reta;Declive", "Curva", "Interseção de Vias"],
+    "uso_solo": ["Sim", "Não"],
+    "tipo_veiculo": ["Automóvel", "Motocicleta", "Caminhonete", "Caminhão-trator", "Ônibus", "0"],
+    "marca": ["FIAT/UNO", "VW/GOL", "HONDA/CG 160", "NA/NA", "Não Informado/Não Informado"],
+    "tipo_envolvido": ["Condutor", "Passageiro", "Pedestre", "Testemunha"],
+    "sexo": ["Masculino", "Feminino", "Ignorado", "0"],
+}
+DIAS_SEMANA = ["segunda-feira", "terça-feira", "quarta-feira",
+               "quinta-feira", "sexta-feira", "sábado", "domingo"]
+
+
+def gerar_base_sintetica(linhas, seed=0):
+    """Gera uma base no formato da PRF (uma linha por envolvido) com `linhas` registros."""
+    rng = np.random.default_rng(seed)
+
+    # ~2,3 envolvidos por acidente, como na base real
+    n_acidentes = max(1, int(linhas / 2.3))
+    ids = np.sort(rng.integers(0, n_acidentes, linhas)) + 500000
+
+    mun_idx = rng.integers(0, len(MUNICIPIOS), n_acidentes)[ids - 500000]
+    municipios = np.array([m[0] for m in MUNICIPIOS])[mun_idx]
+    ufs = np.array([m[1] for m in MUNICIPIOS])[mun_idx]
+    lat = np.array([m[2] for m in MUNICIPIOS])[mun_idx] + rng.normal(0, 0.08, linhas)
+    lon = np.array([m[3] for m in MUNICIPIOS])[mun_idx] + rng.normal(0, 0.08, linhas)
+
+    # Dois anos, para exercitar o seletor de anos
+    datas = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 731, linhas), unit="D")
+    segundos = rng.integers(0, 24 * 3600, linhas)
+
+    df = pd.DataFrame({
+        "id": ids,
+        "data_inversa": datas.strftime("%Y-%m-%d"),
+        "dia_semana": np.array(DIAS_SEMANA)[datas.dayofweek],
+        "horario": pd.to_datetime(segundos, unit="s").strftime("%H:%M:%S"),
+        "uf": ufs,
+        "br": rng.choice([20, 40, 60, 70, 251, 450], linhas),
+        "km": rng.uniform(0, 300, linhas).round(1),
+        "municipio": municipios,
+        "latitude": lat.round(6),
+        "longitude": lon.round(6),
+        "idade": rng.integers(0, 110, linhas),
+        "ano_fabricacao_veiculo": rng.integers(1965, 2025, linhas),
+        "ilesos": rng.binomial(1, 0.45, linhas),
+        "feridos_leves": rng.binomial(1, 0.3, linhas),
+        "feridos_graves": rng.binomial(1, 0.07, linhas),
+        "mortos": rng.binomial(1, 0.02, linhas),
+    })
+    for col, valores in CATEGORIAS.items():
+        df[col] = rng.choice(valores, linhas)
+
+    return df
+
+
+# ==============================================
+# Sessões
+# ==============================================
+def rss_atual_mb():
+    """RSS atual do processo, em MB (Linux: /proc; demais: pico via getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        return rss_pico_mb()
+
+
+def rss_pico_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em bytes no macOS e em KB no Linux
+    return pico / 1024 ** 2 if sys.platform == "darwin" else pico / 1024
+
+
+def compartilhar_bytecode():
+    """
+    Compila o app uma única vez por processo, sob uma trava, e reaproveita o
+    bytecode em todas as sessões.
+
+    O AppTest cria um ScriptCache novo a cada rerun, então cada rerun recompila
+    o script (magic.add_magic + compile). Feito por várias threads ao mesmo
+    tempo, isso dispara "AST constructor recursion depth mismatch" no CPython e
+    o rerun falha. Um servidor Streamlit real também compila o script uma vez.
+    """
+    from streamlit.runtime.scriptrunner import script_cache
+
+    original = script_cache.ScriptCache.get_bytecode
+    trava = threading.Lock()
+    compilados = {}
+
+    def get_bytecode(self, script_path):
+        chave = os.path.abspath(script_path)
+        with trava:
+            if chave not in compilados:
+                compilados[chave] = original(self, script_path)
+        return compilados[chave]
+
+    script_cache.ScriptCache.get_bytecode = get_bytecode
+
+
+def simular_sessao(rodadas, timeout):
+    """Percorre regiões, seções e opções de "Distribuições"; retorna [(ação, segundos)]."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    medicoes = []
+    erros = []
+
+    def rerun(acao, elemento=None):
+        inicio = time.perf_counter()
+        (elemento or at).run()
+        duracao = time.perf_counter() - inicio
+        if at.exception:
+            erros.append(f"{acao}: {at.exception[0].message.splitlines()[0]}")
+        # Sem a barra lateral o script nem chegou a rodar (ex.: erro de compilação,
+        # que não aparece em at.exception): o rerun falhou e não entra nas medições
+        if not len(at.sidebar.radio):
+            erros.append(f"{acao}: rerun falhou (barra lateral ausente)")
+            return
+        medicoes.append((acao, duracao))
+
+    rerun("carga_inicial")
+    if not len(at.sidebar.radio):
+        return medicoes, erros
+    secoes = list(at.sidebar.radio[0].options)
+    regioes = list(at.sidebar.selectbox[0].options) if len(at.sidebar.selectbox) else []
+
+    for _ in range(rodadas):
+        # Troca de região: cada uma lê só as suas partições
+        for regiao in regioes[1:] + regioes[:1]:
+            if not len(at.sidebar.selectbox):
+                erros.append(f"regiao:{regiao}: seletor de região ausente após o rerun anterior")
+                break
+            rerun(f"regiao:{regiao}", at.sidebar.selectbox[0].set_value(regiao))
+        for secao in secoes:
+            if not len(at.sidebar.radio):
+                erros.append(f"secao:{secao}: barra lateral ausente após o rerun anterior")
+                break
+            rerun(f"secao:{secao}", at.sidebar.radio[0].set_value(secao))
+            if secao != "Distribuições" or not len(at.main.selectbox):
+                continue
+            for opt in at.main.selectbox[0].options:
+                if not len(at.main.selectbox):
+                    erros.append(f"distribuicoes:{opt}: selectbox ausente após o rerun anterior")
+                    break
+                rerun(f"distribuicoes:{opt}", at.main.selectbox[0].set_value(opt))
+
+    return medicoes, erros
+
+
+def executar_processo(dir_particoes, sessoes, rodadas, timeout):
+    """Executa `sessoes` sessões concorrentes (threads) dentro de um processo."""
+    os.environ["ACIDENTES_DIR"] = dir_particoes
+    # Importa o streamlit antes de cronometrar, para não contar o import no throughput
+    import streamlit.testing.v1  # noqa: F401
+    compartilhar_bytecode()
+    rss_inicial = rss_atual_mb()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessoes) as pool:
+        resultados = list(pool.map(lambda _: simular_sessao(rodadas, timeout), range(sessoes)))
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "pid": os.getpid(),
+        "sessoes": sessoes,
+        "duracao_s": duracao,
+        "rss_inicial_mb": round(rss_inicial, 1),
+        "rss_final_mb": round(rss_atual_mb(), 1),
+        "rss_pico_mb": round(rss_pico_mb(), 1),
+        "medicoes": [m for medicoes, _ in resultados for m in medicoes],
+        "erros": [e for _, erros in resultados for e in erros],
+    }
+
+
+# ==============================================
+# Relatório
+# ==============================================
+def percentis_ms(valores):
+    v = np.asarray(valores) * 1000
+    if v.size == 0:
+        return {}
+    p50, p95, p99 = np.percentile(v, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "media": round(float(v.mean()), 2),
+        "max": round(float(v.max()), 2),
+        "n": int(v.size),
+    }
+
+
+def rodar_cenario(linhas, sessoes, processos, rodadas, timeout, seed, pasta):
+    caminho = os.path.join(pasta, f"particoes_{linhas}")
+    salvar_particoes(gerar_base_sintetica(linhas, seed), caminho)
+
+    # Distribui as sessões entre os processos
+    por_processo = [sessoes // processos + (i < sessoes % processos) for i in range(processos)]
+    por_processo = [s for s in por_processo if s > 0]
+
+    with ProcessPoolExecutor(max_workers=len(por_processo), mp_context=get_context("spawn")) as pool:
+        futuros = [pool.submit(executar_processo, caminho, s, rodadas, timeout) for s in por_processo]
+        procs = [f.result() for f in futuros]
+
+    medicoes = [m for p in procs for m in p["medicoes"]]
+    por_acao = {}
+    for acao, segundos in medicoes:
+        por_acao.setdefault(acao.split(":")[0], []).append(segundos)
+
+    # Os processos rodam em paralelo: o throughput total é a soma do de cada um,
+    # medido só durante as sessões (sem spawn do processo nem import do streamlit)
+    throughput = sum(len(p["medicoes"]) / p["duracao_s"] for p in procs)
+
+    return {
+        "linhas": linhas,
+        "sessoes": sessoes,
+        "processos": len(por_processo),
+        "rodadas": rodadas,
+        "reruns": len(medicoes),
+        "duracao_s": round(max(p["duracao_s"] for p in procs), 2),
+        "throughput_reruns_s": round(throughput, 2),
+        # A carga inicial (cache frio) fica fora dos percentis principais
+        "latencia_ms": percentis_ms([s for a, s in medicoes if a != "carga_inicial"]),
+        "latencia_carga_inicial_ms": percentis_ms(por_acao.get("carga_inicial", [])),
+        "latencia_por_acao_ms": {a: percentis_ms(v) for a, v in sorted(por_acao.items())},
+        "rss_mb": [
+            {k: p[k] for k in ("pid", "sessoes", "rss_inicial_mb", "rss_final_mb", "rss_pico_mb")}
+            for p in procs
+        ],
+        "n_erros": sum(len(p["erros"]) for p in procs),
+        "erros": [e for p in procs for e in p["erros"]][:20],
+    }
+
+
+CHAVE_CENARIO = ("linhas", "sessoes", "processos", "rodadas")
+
+
+def comparar(relatorio, baseline, tolerancia):
+    """
+    Compara p95 e RSS de pico entre cenários de mesma configuração
+    (linhas, sessões, processos e rodadas); retorna (regressoes, sem_par).
+    """
+    anteriores = {tuple(r.get(c) for c in CHAVE_CENARIO): r for r in baseline.get("resultados", [])}
+    regressoes, sem_par = [], []
+    for r in relatorio["resultados"]:
+        chave = tuple(r[c] for c in CHAVE_CENARIO)
+        b = anteriores.get(chave)
+        if b is None:
+            sem_par.append(dict(zip(CHAVE_CENARIO, chave)))
+            continue
+        metricas = {
+            "latencia_p95_ms": (b["latencia_ms"].get("p95"), r["latencia_ms"].get("p95")),
+            "rss_pico_mb": (max(p["rss_pico_mb"] for p in b["rss_mb"]),
+                            max(p["rss_pico_mb"] for p in r["rss_mb"])),
+        }
+        for nome, (antes, depois) in metricas.items():
+            if antes and depois and depois > antes * (1 + tolerancia):
+                regressoes.append({
+                    **dict(zip(CHAVE_CENARIO, chave)), "metrica": nome,
+                    "antes": antes, "depois": depois,
+                    "variacao_pct": round((depois / antes - 1) * 100, 1),
+                })
+    return regressoes, sem_par
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard Streamlit.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[5000],
+                        help="Tamanhos da base sintética (linhas); um cenário por tamanho.")
+    parser.add_argument("--sessoes", type=int, default=4, help="Sessões concorrentes.")
+    parser.add_argument("--processos", type=int, default=1,
+                        help="Processos entre os quais as sessões são distribuídas.")
+    parser.add_argument("--rodadas", type=int, default=1,
+                        help="Quantas vezes cada sessão percorre todas as seções.")
+    parser.add_argument("--timeout", type=float, default=120.0,
+                        help="Timeout de cada rerun, em segundos.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--saida", default="relatorio_carga.json")
+    parser.add_argument("--baseline", help="Relatório anterior para comparação.")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="Piora relativa aceita frente ao baseline (0.2 = 20%%).")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("versao") != VERSAO_RELATORIO:
+            parser.error(f"baseline na versão {baseline.get('versao')} do relatório; "
+                         f"esperada a versão {VERSAO_RELATORIO}. Gere um novo baseline.")
+
+    relatorio = {
+        "versao": VERSAO_RELATORIO,
+        "gerado_em": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {k: v for k, v in vars(args).items() if k not in ("saida", "baseline")},
+        "resultados": [],
+    }
+
+    with tempfile.TemporaryDirectory() as pasta:
+        for linhas in args.linhas:
+            print(f"Cenário: {linhas} linhas, {args.sessoes} sessões, {args.processos} processo(s)...")
+            r = rodar_cenario(linhas, args.sessoes, args.processos, args.rodadas,
+                              args.timeout, args.seed, pasta)
+            lat = r["latencia_ms"]
+            print(f"  p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms "
+                  f"throughput={r['throughput_reruns_s']} reruns/s "
+                  f"rss_pico={max(p['rss_pico_mb'] for p in r['rss_mb'])}MB "
+                  f"erros={r['n_erros']}")
+            relatorio["resultados"].append(r)
+
+    # Reruns com erro invalidam as medições: o relatório é salvo, mas a execução falha
+    n_erros = sum(r["n_erros"] for r in relatorio["resultados"])
+    codigo = 1 if n_erros else 0
+    if n_erros:
+        print(f"ERRO: {n_erros} rerun(s) com erro; veja 'erros' no relatório.")
+
+    if baseline is not None:
+        regressoes, sem_par = comparar(relatorio, baseline, args.tolerancia)
+        relatorio["regressoes"] = regressoes
+        relatorio["sem_comparacao"] = sem_par
+        for c in sem_par:
+            print(f"AVISO: baseline sem cenário com {c}; não comparado.")
+        for reg in regressoes:
+            print(f"REGRESSÃO ({reg['linhas']} linhas, {reg['sessoes']} sessões, "
+                  f"{reg['processos']} processo(s), {reg['rodadas']} rodada(s)) {reg['metrica']}: "
+                  f"{reg['antes']} -> {reg['depois']} (+{reg['variacao_pct']}%)")
+        codigo = 1 if regressoes else codigo
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"Relatório salvo em {args.saida}")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Armazenamento particionado da base de acidentes da PRF.
+
+A base nacional fica em arquivos Parquet particionados por UF e ano:
+
+    data/particoes/uf=DF/ano=2024/acidentes.parquet
+
+As regiões (RIDE-DF, regiões metropolitanas, UFs inteiras) são definidas em
+regioes.json, mapeando cada UF para "*" (UF inteira) ou para a lista de
+municípios (grafia da PRF: maiúsculas, sem acentos). Ler uma região abre apenas
+as partições das suas UFs e anos; dentro delas, as linhas ficam ordenadas por
+município em row groups pequenos, e o filtro de municípios pula os row groups
+de outros municípios pelas estatísticas do Parquet.
+"""
+
+import json
+import os
+import re
+
+import pandas as pd
+
+DIR_PARTICOES = "data/particoes"
+ARQUIVO_REGIOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regioes.json")
+NOME_ARQUIVO = "acidentes.parquet"
+# Linhas por row group. Com a partição ordenada por município, as estatísticas
+# (mín./máx.) de cada row group deixam o filtro de municípios pular os demais.
+LINHAS_POR_GRUPO = 16384
+# Formatos de data_inversa nos arquivos da PRF (os mais antigos usam dd/mm/aaaa)
+FORMATOS_DATA = ["ISO8601", "%d/%m/%Y", "%d/%m/%y"]
+
+_PADRAO_UF = re.compile(r"^uf=([A-Z]{2})$")
+_PADRAO_ANO = re.compile(r"^ano=(\d{4})$")
+
+
+def carregar_regioes(path=ARQUIVO_REGIOES):
+    """Lê as definições de região; valida que cada UF aponta para "*" ou lista de municípios."""
+    with open(path, encoding="utf-8") as f:
+        regioes = json.load(f)
+
+    for nome, cfg in regioes.items():
+        ufs = cfg.get("ufs")
+        if not isinstance(ufs, dict) or not ufs:
+            raise ValueError(f"Região '{nome}': 'ufs' deve ser um objeto UF -> \"*\" ou lista.")
+        for uf, municipios in ufs.items():
+            if municipios != "*" and not isinstance(municipios, list):
+                raise ValueError(f"Região '{nome}', UF {uf}: use \"*\" ou uma lista de municípios.")
+
+    return regioes
+
+
+def caminho_particao(base, uf, ano):
+    return os.path.join(base, f"uf={uf}", f"ano={ano}", NOME_ARQUIVO)
+
+
+def listar_particoes(base=DIR_PARTICOES):
+    """Retorna {(uf, ano): caminho} das partições existentes em `base`."""
+    particoes = {}
+    if not os.path.isdir(base):
+        return particoes
+
+    for dir_uf in os.listdir(base):
+        m_uf = _PADRAO_UF.match(dir_uf)
+        if not m_uf:
+            continue
+        for dir_ano in os.listdir(os.path.join(base, dir_uf)):
+            m_ano = _PADRAO_ANO.match(dir_ano)
+            caminho = os.path.join(base, dir_uf, dir_ano, NOME_ARQUIVO)
+            if m_ano and os.path.isfile(caminho):
+                particoes[(m_uf.group(1), int(m_ano.group(1)))] = caminho
+
+    return particoes
+
+
+def anos_disponiveis(particoes, regiao):
+    """Anos com ao menos uma partição entre as UFs da região."""
+    ufs = set(regiao["ufs"])
+    return sorted({ano for uf, ano in particoes if uf in ufs})
+
+
+def ler_regiao(particoes, regiao, anos):
+    """Lê só as partições (UF, ano) da região, filtrando os municípios na leitura."""
+    partes = []
+    for uf, municipios in sorted(regiao["ufs"].items()):
+        filtros = None
+        if municipios != "*":
+            filtros = [("municipio", "in", [m.upper() for m in municipios])]
+        for ano in sorted(anos):
+            caminho = particoes.get((uf, ano))
+            if caminho is not None:
+                partes.append(pd.read_parquet(caminho, filters=filtros))
+
+    if not partes:
+        return pd.DataFrame()
+    return pd.concat(partes, ignore_index=True)
+
+
+def converter_datas(valores):
+    """Converte data_inversa tentando cada formato de FORMATOS_DATA, em ordem."""
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        return valores
+    texto = valores.astype("string").str.strip()
+    datas = pd.Series(pd.NaT, index=valores.index, dtype="datetime64[ns]")
+    for formato in FORMATOS_DATA:
+        faltando = datas.isna() & texto.notna()
+        if not faltando.any():
+            break
+        datas[faltando] = pd.to_datetime(texto[faltando], format=formato, errors="coerce")
+    return datas
+
+
+def salvar_particoes(df, base=DIR_PARTICOES):
+    """
+    Grava `df` particionado por UF e ano (sobrescreve as partições existentes).
+    Cada partição é ordenada por município e gravada em row groups de
+    LINHAS_POR_GRUPO linhas. Retorna (caminhos gravados, linhas descartadas
+    por falta de UF ou de data válida).
+    """
+    df = df.copy()
+    df["uf"] = df["uf"].astype("string").str.strip().str.upper()
+    df["municipio"] = df["municipio"].astype("string").str.strip().str.upper()
+    df["data_inversa"] = converter_datas(df["data_inversa"])
+    total = len(df)
+    df = df.dropna(subset=["uf", "data_inversa"])
+    descartadas = total - len(df)
+
+    # Colunas de texto com tipos mistos (ex.: "0" e 0) quebram o esquema do Parquet
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype("string")
+
+    gravadas = []
+    for (uf, ano), parte in df.groupby([df["uf"], df["data_inversa"].dt.year]):
+        caminho = caminho_particao(base, uf, int(ano))
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        parte = parte.sort_values("municipio", kind="stable")
+        parte.to_parquet(caminho, index=False, row_group_size=LINHAS_POR_GRUPO)
+        gravadas.append(caminho)
+
+    return gravadas, descartadas
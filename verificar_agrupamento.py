@@ -0,0 +1,89 @@
+"""
+Verificações do agrupamento por perfil (agrupamento.py) e da sua seção no app.
+
+O repositório não tem suíte de testes; este script roda asserções diretas e
+um AppTest do Streamlit sobre uma base sintética particionada (a mesma do
+loadtest.py). Termina com erro na primeira verificação que falhar.
+
+Exemplo:
+    python verificar_agrupamento.py
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from agrupamento import agrupar_perfis, escolher_k
+from loadtest import APP_PATH, gerar_base_sintetica
+from particoes import salvar_particoes
+
+
+def base_preparada(linhas, seed=0):
+    df = gerar_base_sintetica(linhas, seed)
+    df["hora"] = pd.to_datetime(df["horario"], format="%H:%M:%S").dt.hour
+    df["total_vitimas"] = df[["feridos_leves", "feridos_graves", "mortos"]].sum(axis=1)
+    return df
+
+
+def verificar_modulo():
+    # Quatro grupos bem separados: a silhueta deve escolher k = 4
+    rng = np.random.default_rng(0)
+    X = np.vstack([rng.normal(c, 0.3, (500, 5)) for c in [0, 3, 6, 9]])
+    k, rotulos, _, _ = escolher_k(X)
+    assert k == 4, f"esperado k = 4, obtido {k}"
+    assert len(np.unique(rotulos)) == 4
+
+    # Nenhum k menor que o número de pontos: erro claro, não max() de sequência vazia
+    try:
+        escolher_k(X[:5], ks=range(8, 13))
+    except ValueError as e:
+        assert "Nenhum k válido" in str(e)
+    else:
+        raise AssertionError("escolher_k deveria rejeitar uma faixa de k sem valores válidos")
+
+    df = base_preparada(20000)
+    n = df[["uf", "municipio"]].drop_duplicates().shape[0]
+    assert agrupar_perfis(df, "municipio", ks=range(n, n + 4)) is None
+
+    r = agrupar_perfis(df, "municipio", ks=range(2, 5))
+    assert r is not None and 2 <= r["k"] <= 4
+    assert set(r["perfis"]["grupo"]) == set(range(1, r["k"] + 1))
+
+    # causa_principal como string anulável com <NA> (como sai do Parquet): <NA> conta como "não"
+    df_na = df.copy()
+    df_na["causa_principal"] = df_na["causa_principal"].astype("string")
+    df_na.loc[df_na.index[::7], "causa_principal"] = pd.NA
+    r = agrupar_perfis(df_na, "municipio", ks=range(2, 5))
+    assert r is not None and 2 <= r["k"] <= 4
+    print("agrupamento.py: ok")
+
+
+def verificar_app(pasta):
+    from streamlit.testing.v1 import AppTest
+
+    salvar_particoes(gerar_base_sintetica(20000), pasta)
+    os.environ["ACIDENTES_DIR"] = pasta
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    at.sidebar.multiselect[0].set_value([2023, 2024]).run()
+    at.sidebar.radio[0].set_value("Geografia").run()
+    at.main.number_input[0].set_value(100).run()
+
+    # Faixa de k acima do número de municípios: aviso, sem exceção
+    at.main.slider[0].set_value((11, 12)).run()
+    assert not at.exception, at.exception
+    assert any("faixa de k" in i.value for i in at.info), "esperado st.info para a faixa de k inválida"
+
+    at.main.slider[0].set_value((2, 4)).run()
+    assert not at.exception, at.exception
+    assert any("grupos" in c.value for c in at.caption), "esperado o resultado do agrupamento"
+    print("app.py (Geografia / agrupamentos): ok")
+
+
+if __name__ == "__main__":
+    verificar_modulo()
+    with tempfile.TemporaryDirectory() as pasta:
+        verificar_app(pasta)
@@ -0,0 +1,127 @@
+"""
+Verificações do armazenamento particionado (particoes.py).
+
+O repositório não tem suíte de testes; este script roda asserções diretas
+sobre partições gravadas num diretório temporário. Termina com erro na
+primeira verificação que falhar.
+
+Exemplo:
+    python verificar_particoes.py
+"""
+
+import json
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from particoes import (carregar_regioes, caminho_particao, ler_regiao, listar_particoes,
+                       salvar_particoes)
+
+
+def base_minima():
+    return pd.DataFrame({
+        "id": range(8),
+        "uf": ["df", "DF", "GO", "GO", "GO", "GO", "MG", None],
+        "municipio": ["brasilia", "BRASILIA", "GOIANIA", "ANAPOLIS", "LUZIANIA", "GOIANIA",
+                      "UNAI", "SEM UF"],
+        "data_inversa": ["2023-05-01", "02/03/2024", "2024-01-10", "10/01/2024", "2023-07-15",
+                         "data ruim", "15/07/2023", "2024-01-01"],
+        "br": ["40", 40, 60, 153, 40, 60, 251, 40],
+    })
+
+
+def verificar_regioes(pasta):
+    validas = {"R": {"descricao": "ok", "ufs": {"DF": "*", "GO": ["GOIANIA"]}}}
+    invalidas = [
+        {"R": {"descricao": "sem ufs"}},
+        {"R": {"ufs": {}}},
+        {"R": {"ufs": ["DF"]}},
+        {"R": {"ufs": {"GO": "GOIANIA"}}},
+    ]
+
+    path = os.path.join(pasta, "regioes.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(validas, f)
+    assert carregar_regioes(path) == validas
+
+    for cfg in invalidas:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cfg, f)
+        try:
+            carregar_regioes(path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"carregar_regioes deveria rejeitar {cfg}")
+
+    # O regioes.json do repositório precisa continuar válido
+    assert "RIDE-DF" in carregar_regioes()
+    print("carregar_regioes: ok")
+
+
+def verificar_gravacao(base):
+    df = base_minima()
+    gravadas, descartadas = salvar_particoes(df, base)
+
+    # Sem UF ("SEM UF") e data ilegível ("data ruim") são descartadas; dd/mm/aaaa não
+    assert descartadas == 2, f"esperado 2 linhas descartadas, obtido {descartadas}"
+    esperadas = {("DF", 2023), ("DF", 2024), ("GO", 2023), ("GO", 2024), ("MG", 2023)}
+    assert sorted(gravadas) == sorted(caminho_particao(base, uf, ano) for uf, ano in esperadas)
+
+    # Ida e volta: mesmas linhas, UF e município normalizados, partição ordenada por município
+    lido = pd.concat([pd.read_parquet(p) for p in gravadas], ignore_index=True)
+    assert sorted(lido["id"]) == [0, 1, 2, 3, 4, 6]
+    assert set(lido["uf"]) == {"DF", "GO", "MG"}
+    assert "BRASILIA" in set(lido["municipio"]) and "brasilia" not in set(lido["municipio"])
+    assert pd.api.types.is_datetime64_any_dtype(lido["data_inversa"])
+    assert lido.set_index("id").loc[1, "data_inversa"] == pd.Timestamp("2024-03-02")
+    go_2024 = pd.read_parquet(caminho_particao(base, "GO", 2024))
+    assert list(go_2024["municipio"]) == ["ANAPOLIS", "GOIANIA"]
+    print("salvar_particoes: ok")
+
+
+def verificar_leitura(base):
+    # Diretórios e arquivos fora do padrão uf=XX/ano=AAAA são ignorados
+    os.makedirs(os.path.join(base, "tmp", "ano=2024"))
+    os.makedirs(os.path.join(base, "uf=GO", "2024"))
+    os.makedirs(os.path.join(base, "uf=GO", "ano=2025"))
+    open(os.path.join(base, "uf=go_antigo"), "w").close()
+    particoes = listar_particoes(base)
+    assert set(particoes) == {("DF", 2023), ("DF", 2024), ("GO", 2023), ("GO", 2024), ("MG", 2023)}
+    assert listar_particoes(os.path.join(base, "inexistente")) == {}
+
+    # Só as UFs, anos e municípios da região
+    regiao = {"ufs": {"DF": "*", "GO": ["goiania", "LUZIANIA"]}}
+    lido = ler_regiao(particoes, regiao, [2024])
+    assert sorted(lido["id"]) == [1, 2], sorted(lido["id"])
+    lido = ler_regiao(particoes, regiao, [2023, 2024])
+    assert sorted(lido["id"]) == [0, 1, 2, 4], sorted(lido["id"])
+    assert ler_regiao(particoes, {"ufs": {"SP": "*"}}, [2024]).empty
+
+    # Row groups de poucas linhas: o filtro de municípios pula os de outros municípios
+    muitos = pd.DataFrame({
+        "uf": "GO",
+        "municipio": [f"MUNICIPIO {i % 50:02d}" for i in range(50 * 400)],
+        "data_inversa": "2022-06-01",
+    })
+    base_grande = os.path.join(base, "grande")
+    (caminho,), _ = salvar_particoes(muitos, base_grande)
+    meta = pq.ParquetFile(caminho).metadata
+    assert meta.num_row_groups > 1
+    col = meta.schema.names.index("municipio")
+    faixas = [(meta.row_group(i).column(col).statistics.min, meta.row_group(i).column(col).statistics.max)
+              for i in range(meta.num_row_groups)]
+    assert all(a[1] <= b[0] for a, b in zip(faixas, faixas[1:])), f"row groups sobrepostos: {faixas}"
+    lido = ler_regiao(listar_particoes(base_grande), {"ufs": {"GO": ["MUNICIPIO 07"]}}, [2022])
+    assert len(lido) == 400 and set(lido["municipio"]) == {"MUNICIPIO 07"}
+    print("listar_particoes / ler_regiao: ok")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as pasta:
+        verificar_regioes(pasta)
+        base = os.path.join(pasta, "particoes")
+        verificar_gravacao(base)
+        verificar_leitura(base)